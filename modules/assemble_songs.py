@@ -1,5 +1,6 @@
 import os
 from pydub import AudioSegment
+from media_probe import stream_packets, packets_duration
 from logger import ColoredLogger
 
 logger = ColoredLogger("ASSEMBLE")
@@ -29,17 +30,98 @@ def save_names(file_path, names):
         for name in names:
             f.write(name + '\n')
 
+def select_songs(config):
+    """
+    Pick processed tracks in directory order until VIDEO_LENGTH_MINUTES is covered, reading
+    durations from packet timestamps instead of decoding. Returns the list of file paths.
+    """
+    PROCESSED_DIR = config["PROCESSED_DIR"]
+    min_duration_ms = config["VIDEO_LENGTH_MINUTES"] * 60 * 1000
+
+    total_duration = 0
+    used_files = []
+    for filename in os.listdir(PROCESSED_DIR):
+        if filename.lower().endswith('.mp3'):
+            file_path = os.path.join(PROCESSED_DIR, filename)
+            used_files.append(file_path)
+            total_duration += int(packets_duration(*stream_packets(file_path, "a")) * 1000)
+            if total_duration >= min_duration_ms:
+                return used_files
+
+    logger.error(f"Insufficient audio: {total_duration//60000}min")
+    raise RuntimeError("Insufficient audio duration")
+
+def peek_title(config):
+    """
+    Return (title_line, title_name) for the next available title without marking it:
+    the raw line from the template file and the final title.
+    """
+    names, next_name_index = load_names(config["TITLE_TEMPLATE_FILE"])
+    if next_name_index is None:
+        logger.error("No available titles")
+        raise RuntimeError("No titles available")
+    title_line = names[next_name_index]
+    return title_line, title_line.replace("[video_length]", str(config["VIDEO_LENGTH_MINUTES"]))
+
+def mark_title(config, title_line, used=True):
+    """Mark title_line as used (or available again) if title marking is enabled."""
+    if not config.get("MARK_USED_TITLE_NAMES", True):
+        return
+    TITLE_TEMPLATE_FILE = config["TITLE_TEMPLATE_FILE"]
+    names, _ = load_names(TITLE_TEMPLATE_FILE)
+    current, new = (title_line, '-' + title_line) if used else ('-' + title_line, title_line)
+    if current in names:
+        names[names.index(current)] = new
+        save_names(TITLE_TEMPLATE_FILE, names)
+
+def select_title(config):
+    """Take the next available title and mark it used if enabled. Returns (title_line, title_name)."""
+    title_line, title_name = peek_title(config)
+    mark_title(config, title_line)
+    return title_line, title_name
+
+def build_track_plan(config, files=None):
+    """
+    Decode the tracks for the mix: the given files, or the ones select_songs picks, so drafts,
+    single runs and worker jobs all cut the tracklist at the same place. Returns
+    (audio_segments, track_list, used_files, total_duration), where track_list holds
+    (track_name, start_ms) pairs on the mix timeline. Nothing is written or deleted.
+    """
+    if files is None:
+        logger.info(f"Scanning {config['PROCESSED_DIR']}")
+        files = select_songs(config)
+
+    audio_segments = []
+    total_duration = 0
+    track_list = []
+    used_files = []
+    for file_path in files:
+        audio = AudioSegment.from_mp3(file_path)
+        audio_duration = len(audio)
+
+        audio_segments.append(audio)
+        track_list.append((os.path.basename(file_path)[:-4], total_duration))
+        used_files.append(file_path)
+        total_duration += audio_duration
+
+    logger.info(f"Total duration: {total_duration//60000}:{(total_duration%60000)//1000:02}")
+    return audio_segments, track_list, used_files, total_duration
+
+def build_tracklist(track_list):
+    """Return the description tracklist lines for (track_name, start_ms) pairs."""
+    tracklist_content = ["\nTrack list:"]
+    for track_name, start_time in track_list:
+        timestamp = format_time(start_time)
+        tracklist_content.append(f"{timestamp} Spectraform - {track_name}")
+    return tracklist_content
+
 def assemble_songs(config):
     logger.module_start()
-    PROCESSED_DIR = config["PROCESSED_DIR"]
     DESCRIPTION_OUTPUT_FILE = config["DESCRIPTION_OUTPUT_FILE"]
     DESCRIPTION_TEMPLATE_FILE = config["DESCRIPTION_TEMPLATE_FILE"]
     VIDEO_LENGTH_MINUTES = config["VIDEO_LENGTH_MINUTES"]
-    TITLE_TEMPLATE_FILE = config["TITLE_TEMPLATE_FILE"]
     TITLE_OUTPUT_FILE = config["TITLE_OUTPUT_FILE"]
     
-    min_duration_ms = VIDEO_LENGTH_MINUTES * 60 * 1000
-
     try:
         # Load description template
         if not os.path.exists(DESCRIPTION_TEMPLATE_FILE):
@@ -50,31 +132,7 @@ def assemble_songs(config):
             description_template = f.read()
 
         # Process audio files
-        audio_segments = []
-        total_duration = 0
-        track_list = []
-        used_files = []
-
-        logger.info(f"Scanning {PROCESSED_DIR}")
-        for filename in os.listdir(PROCESSED_DIR):
-            if filename.lower().endswith('.mp3'):
-                file_path = os.path.join(PROCESSED_DIR, filename)
-                audio = AudioSegment.from_mp3(file_path)
-                audio_duration = len(audio)
-
-                audio_segments.append(audio)
-                track_list.append((filename[:-4], total_duration))
-                used_files.append(file_path)
-                total_duration += audio_duration
-
-                if total_duration >= min_duration_ms:
-                    break
-
-        if total_duration < min_duration_ms:
-            logger.error(f"Insufficient audio: {total_duration//60000}min")
-            raise RuntimeError("Insufficient audio duration")
-
-        logger.info(f"Total duration: {total_duration//60000}:{(total_duration%60000)//1000:02}")
+        audio_segments, track_list, used_files, total_duration = build_track_plan(config, config.get("SELECTED_SONGS"))
 
         # Generate final audio mix
         final_audio = sum(audio_segments)
@@ -83,7 +141,9 @@ def assemble_songs(config):
         logger.info(f"Exported audio mix: {output_path}")
 
         # Cleanup processed files if deletion is enabled
-        if config.get("DELETE_PROCESSED", True):
+        if config.get("SELECTED_SONGS"):
+            logger.info(f"Left {len(used_files)} claimed files for the job to clean up")
+        elif config.get("DELETE_PROCESSED", True):
             for file_path in used_files:
                 os.remove(file_path)
             logger.info(f"Removed {len(used_files)} processed files")
@@ -97,10 +157,7 @@ def assemble_songs(config):
         )
 
         # Generate tracklist content
-        tracklist_content = ["\nTrack list:"]
-        for track_name, start_time in track_list:
-            timestamp = format_time(start_time)
-            tracklist_content.append(f"{timestamp} Spectraform - {track_name}")
+        tracklist_content = build_tracklist(track_list)
 
         # Split the template at the placeholder
         if "[TRACKLIST_PLACEHOLDER]" not in processed_desc:
@@ -116,18 +173,9 @@ def assemble_songs(config):
         logger.info("Generated description file")
 
         # Handle title selection
-        names, next_name_index = load_names(TITLE_TEMPLATE_FILE)
-        if next_name_index is None:
-            logger.error("No available titles")
-            raise RuntimeError("No titles available")
-
-        title_name = names[next_name_index].replace("[video_length]", str(VIDEO_LENGTH_MINUTES))
+        title_name = config.get("SELECTED_TITLE") or select_title(config)[1]
         with open(TITLE_OUTPUT_FILE, 'w', encoding='utf-8') as title_file:
             title_file.write(title_name + '\n')
-        
-        if config.get("MARK_USED_TITLE_NAMES", True):
-            names[next_name_index] = '-' + names[next_name_index]
-            save_names(TITLE_TEMPLATE_FILE, names)
         logger.success("Assembly completed")
 
     except Exception as e:
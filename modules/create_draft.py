@@ -0,0 +1,130 @@
+#create_draft.py
+import os
+import random
+import numpy as np
+from PIL import Image
+from moviepy import AudioFileClip, ImageClip
+from assemble_songs import build_track_plan, build_tracklist, load_names
+from create_video import load_draft_image
+from logger import ColoredLogger
+
+logger = ColoredLogger("DRAFT")
+
+def sample_track(audio, sample_ms):
+    """Keep the first and last sample_ms of a track so the transitions stay audible."""
+    if not sample_ms or len(audio) <= 2 * sample_ms:
+        return audio
+    return audio[:sample_ms] + audio[-sample_ms:]
+
+def create_draft(config):
+    """
+    Render a low-resolution QA preview from the same track plan assemble_songs would use.
+    Processed files, titles, song names and images are left untouched; the image picked here
+    is saved to DRAFT_IMAGE_FILE so the next real render uses the same one.
+    """
+    logger.module_start()
+    IMAGES_DIR = config["IMAGES_DIR"]
+    DRAFT_AUDIO_FILE = config["DRAFT_AUDIO_FILE"]
+    DRAFT_VIDEO_FILE = config["DRAFT_VIDEO_FILE"]
+    DRAFT_DESCRIPTION_FILE = config["DRAFT_DESCRIPTION_FILE"]
+    sample_ms = int(config.get("DRAFT_SAMPLE_SECONDS", 15) * 1000)
+
+    if not os.path.exists(IMAGES_DIR):
+        logger.error(f"Missing template directory: {IMAGES_DIR}")
+        raise FileNotFoundError(f"Directory not found: {IMAGES_DIR}")
+
+    image_files = [f for f in os.listdir(IMAGES_DIR)
+                   if f.lower().endswith(('png', 'jpg', 'jpeg'))]
+
+    if not image_files:
+        logger.error("No images available in templates")
+        raise RuntimeError("No template images available")
+
+    try:
+        audio_segments, track_list, _, _ = build_track_plan(config)
+
+        # Build the (optionally time-compressed) draft timeline
+        draft_segments = []
+        draft_track_list = []
+        draft_duration = 0
+        for audio, (track_name, _) in zip(audio_segments, track_list):
+            sampled = sample_track(audio, sample_ms)
+            draft_segments.append(sampled)
+            draft_track_list.append((track_name, draft_duration))
+            draft_duration += len(sampled)
+
+        draft_audio = sum(draft_segments)
+        draft_audio = draft_audio.set_channels(1).set_frame_rate(config.get("DRAFT_AUDIO_FRAME_RATE", 22050))
+        draft_audio.export(DRAFT_AUDIO_FILE, format='mp3',
+                           bitrate=config.get("DRAFT_AUDIO_BITRATE", "48k"))
+        logger.info(f"Exported draft audio: {DRAFT_AUDIO_FILE} "
+                    f"({draft_duration//60000}:{(draft_duration%60000)//1000:02})")
+
+        # Reuse the image of an earlier draft, otherwise pick one and keep it for the real render
+        image_path = load_draft_image(config)
+        if image_path is None:
+            image_path = os.path.join(IMAGES_DIR, random.choice(image_files))
+            with open(config["DRAFT_IMAGE_FILE"], 'w', encoding='utf-8') as f:
+                f.write(os.path.basename(image_path) + '\n')
+        logger.info(f"Selected image: {os.path.basename(image_path)}")
+
+        # Title that would be picked next, the image, and the tracklist on both timelines
+        draft_description = []
+        pending_uploads = []
+        if os.path.exists(config["UNPROCESSED_DIR"]):
+            pending_uploads = [f for f in os.listdir(config["UNPROCESSED_DIR"]) if f.lower().endswith('.mp3')]
+        if pending_uploads:
+            # A real run processes these first, which can change the picked tracks
+            logger.error(f"{len(pending_uploads)} pending uploads in {config['UNPROCESSED_DIR']}; "
+                         "the real tracklist may differ from this draft")
+            draft_description.append(f"WARNING: {len(pending_uploads)} pending uploads will be processed "
+                                     "before the real render and may change this tracklist")
+        names, next_name_index = load_names(config["TITLE_TEMPLATE_FILE"])
+        if next_name_index is not None:
+            title_name = names[next_name_index].replace("[video_length]", str(config["VIDEO_LENGTH_MINUTES"]))
+            draft_description.append(f"Next title: {title_name}")
+        draft_description.append(f"Image: {os.path.basename(image_path)}")
+        published_tracklist = build_tracklist(track_list)
+        published_tracklist[0] = "\nTrack list (published video):"
+        draft_description.extend(published_tracklist)
+        if draft_track_list != track_list:
+            sampled_tracklist = build_tracklist(draft_track_list)
+            sampled_tracklist[0] = f"\nTrack list (draft, first/last {sample_ms // 1000}s of each track):"
+            draft_description.extend(sampled_tracklist)
+        with open(DRAFT_DESCRIPTION_FILE, 'w', encoding='utf-8') as desc_file:
+            desc_file.write("\n".join(draft_description) + '\n')
+        logger.info(f"Generated draft tracklist: {DRAFT_DESCRIPTION_FILE}")
+
+        # Downscale the image up front so the encoder only ever sees tiny frames
+        draft_width = config.get("DRAFT_WIDTH", 320)
+        with Image.open(image_path) as img:
+            img = img.convert("RGB")
+            draft_height = max(2, round(img.height * draft_width / img.width / 2) * 2)
+            frame = np.array(img.resize((draft_width, draft_height)))
+
+        audio_clip = AudioFileClip(DRAFT_AUDIO_FILE)
+        fps = config.get("DRAFT_FPS", 1)
+        image_clip = ImageClip(frame).with_duration(audio_clip.duration).with_fps(fps)
+        video = image_clip.with_audio(audio_clip)
+
+        logger.info("Rendering draft video...")
+        video.write_videofile(
+            DRAFT_VIDEO_FILE,
+            fps=fps,
+            codec="libx264",
+            audio_codec="aac",
+            bitrate=config.get("DRAFT_VIDEO_BITRATE", "100k"),
+            audio_bitrate=config.get("DRAFT_AUDIO_BITRATE", "48k"),
+            preset="ultrafast",
+            logger=None,
+        )
+        audio_clip.close()
+        logger.success(f"Draft created: {DRAFT_VIDEO_FILE}")
+
+        if config.get("DELETE_AUDIO_MIX", True) and os.path.exists(DRAFT_AUDIO_FILE):
+            os.remove(DRAFT_AUDIO_FILE)
+            logger.info("Removed temporary draft audio file")
+
+    except Exception as e:
+        logger.error(f"Draft creation failed: {str(e)}")
+        raise
@@ -2,45 +2,94 @@
 import os
 import random
 from moviepy import AudioFileClip, ImageClip
+from visualizer import render_visualizer
+from parallel_encode import encode_parallel
 from logger import ColoredLogger
 
 logger = ColoredLogger("VIDEO")
 
-def create_video(config):
-    logger.module_start()
+def load_draft_image(config):
+    """Return the image picked by the last draft render, or None if there is none or it is gone."""
+    DRAFT_IMAGE_FILE = config.get("DRAFT_IMAGE_FILE")
+    if not DRAFT_IMAGE_FILE or not os.path.exists(DRAFT_IMAGE_FILE):
+        return None
+    with open(DRAFT_IMAGE_FILE, 'r', encoding='utf-8') as f:
+        image_name = f.read().strip()
+    image_path = os.path.join(config["IMAGES_DIR"], image_name)
+    if image_name and os.path.exists(image_path):
+        return image_path
+    return None
+
+def clear_draft_image(config, image_path):
+    """Drop the draft pin once a video has been rendered with the pinned image."""
+    DRAFT_IMAGE_FILE = config.get("DRAFT_IMAGE_FILE")
+    if not DRAFT_IMAGE_FILE or not os.path.exists(DRAFT_IMAGE_FILE):
+        return
+    with open(DRAFT_IMAGE_FILE, 'r', encoding='utf-8') as f:
+        image_name = f.read().strip()
+    if image_name == os.path.basename(image_path):
+        os.remove(DRAFT_IMAGE_FILE)
+        logger.info(f"Cleared draft image pin: {image_name}")
+
+def select_image(config):
+    """
+    Store the image for this video in config and return it: an already selected image,
+    else the one the last draft previewed, else a random template image.
+    """
     IMAGES_DIR = config["IMAGES_DIR"]
-    AUDIO_MIX_FILE = config["AUDIO_MIX_FILE"]
-    VIDEO_OUTPUT_FILE = config["VIDEO_OUTPUT_FILE"]
+    if config.get("SELECTED_IMAGE") and os.path.exists(config["SELECTED_IMAGE"]):
+        return config["SELECTED_IMAGE"]
+
+    image_path = load_draft_image(config)
+    if image_path:
+        # The pin is kept until a video with this image exists (see clear_draft_image)
+        config["SELECTED_IMAGE"] = image_path
+        logger.info(f"Selected image from draft: {os.path.basename(image_path)}")
+        return image_path
 
     if not os.path.exists(IMAGES_DIR):
         logger.error(f"Missing template directory: {IMAGES_DIR}")
         raise FileNotFoundError(f"Directory not found: {IMAGES_DIR}")
     
-    if not os.path.exists(AUDIO_MIX_FILE):
-        logger.error(f"Missing audio file: {AUDIO_MIX_FILE}")
-        raise FileNotFoundError(f"File not found: {AUDIO_MIX_FILE}")
-    
     image_files = [f for f in os.listdir(IMAGES_DIR)
                    if f.lower().endswith(('png', 'jpg', 'jpeg'))]
     
     if not image_files:
         logger.error("No images available in templates")
         raise RuntimeError("No template images available")
+
+    # Select and store image path for thumbnail creation
+    image_path = os.path.join(IMAGES_DIR, random.choice(image_files))
+    config["SELECTED_IMAGE"] = image_path
+    logger.info(f"Selected image: {os.path.basename(image_path)}")
+    return image_path
+
+def create_video(config):
+    logger.module_start()
+    AUDIO_MIX_FILE = config["AUDIO_MIX_FILE"]
+    VIDEO_OUTPUT_FILE = config["VIDEO_OUTPUT_FILE"]
+    
+    if not os.path.exists(AUDIO_MIX_FILE):
+        logger.error(f"Missing audio file: {AUDIO_MIX_FILE}")
+        raise FileNotFoundError(f"File not found: {AUDIO_MIX_FILE}")
+    
+    image_path = select_image(config)
     
     try:
-        # Select and store image path for thumbnail creation
-        image_path = os.path.join(IMAGES_DIR, random.choice(image_files))
-        config["SELECTED_IMAGE"] = image_path
-        logger.info(f"Selected image: {os.path.basename(image_path)}")
-        
         # Create video
-        audio_clip = AudioFileClip(AUDIO_MIX_FILE)
-        image_clip = ImageClip(image_path).with_duration(audio_clip.duration).with_fps(24)
-        video = image_clip.with_audio(audio_clip)
-        
-        logger.info("Rendering video...")
-        video.write_videofile(VIDEO_OUTPUT_FILE, codec="libx264", audio_codec="aac")
+        if config.get("VISUALIZER", False):
+            render_visualizer(config, image_path, AUDIO_MIX_FILE, VIDEO_OUTPUT_FILE)
+        elif config.get("PARALLEL_ENCODE", False):
+            encode_parallel(config, image_path, AUDIO_MIX_FILE, VIDEO_OUTPUT_FILE)
+        else:
+            audio_clip = AudioFileClip(AUDIO_MIX_FILE)
+            image_clip = ImageClip(image_path).with_duration(audio_clip.duration).with_fps(24)
+            video = image_clip.with_audio(audio_clip)
+            
+            logger.info("Rendering video...")
+            video.write_videofile(VIDEO_OUTPUT_FILE, codec="libx264", audio_codec="aac")
         logger.success(f"Video created: {VIDEO_OUTPUT_FILE}")
+        clear_draft_image(config, image_path)
         
         # Cleanup audio file if deletion is enabled
         if config.get("DELETE_AUDIO_MIX", True) and os.path.exists(AUDIO_MIX_FILE):
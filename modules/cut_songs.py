@@ -1,7 +1,10 @@
 #cut_songs.py
 import os
+import shutil
+import time
 from pydub import AudioSegment
 from pydub.silence import detect_silence
+from fingerprint import FingerprintIndex, compute_query_fingerprints
 from logger import ColoredLogger
 
 logger = ColoredLogger("CUT")
@@ -25,6 +28,9 @@ def process_songs(config):
     UNPROCESSED_DIR = config["UNPROCESSED_DIR"]
     PROCESSED_DIR = config["PROCESSED_DIR"]
     NAMES_FILE_PATH = config["SONG_NAMES_FILE"]
+    FINGERPRINT_INDEX_FILE = config.get("FINGERPRINT_INDEX_FILE")
+    DUPLICATE_THRESHOLD = config.get("DUPLICATE_THRESHOLD", 0.75)
+    index = None
     
     try:
         if not os.path.exists(PROCESSED_DIR):
@@ -36,6 +42,9 @@ def process_songs(config):
             logger.error("No song names available")
             return
 
+        if FINGERPRINT_INDEX_FILE:
+            index = FingerprintIndex(FINGERPRINT_INDEX_FILE)
+
         processed_count = 0
         for filename in os.listdir(UNPROCESSED_DIR):
             if filename.lower().endswith('.mp3'):
@@ -51,6 +60,26 @@ def process_songs(config):
                         os.remove(file_path)  # Delete the original file if enabled
                     continue  # Move to the next file
 
+                # Reject or flag near-duplicates of anything already processed
+                fingerprint = None
+                if index is not None:
+                    fingerprint, shifted = compute_query_fingerprints(audio)
+                    match_name, similarity = index.query(shifted)
+                    if match_name is not None and similarity >= DUPLICATE_THRESHOLD:
+                        DUPLICATES_DIR = config["DUPLICATES_DIR"]
+                        if not os.path.exists(DUPLICATES_DIR):
+                            os.makedirs(DUPLICATES_DIR)
+                        if config.get("DUPLICATE_ACTION", "flag") == "flag":
+                            # Logged as an error and listed in a file so it gets reviewed
+                            logger.error(f"Possible duplicate of '{match_name}' ({similarity:.3f}): {filename}")
+                            with open(os.path.join(DUPLICATES_DIR, "flagged.txt"), 'a', encoding='utf-8') as f:
+                                f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')}\t{filename}\t{match_name}\t{similarity:.3f}\n")
+                        else:
+                            # Quarantine instead of deleting, so a false match can be recovered
+                            shutil.move(file_path, os.path.join(DUPLICATES_DIR, filename))
+                            logger.info(f"Moved {filename} to {DUPLICATES_DIR}, duplicate of '{match_name}' ({similarity:.3f})")
+                            continue
+
                 analysis_segment = audio[config["START_OFFSET"]:]
                 
                 silences = detect_silence(
@@ -78,17 +107,21 @@ def process_songs(config):
 
                 new_filename = f"{names[next_name_index]}.mp3"
                 output_path = os.path.join(PROCESSED_DIR, new_filename)
-                final_audio.export(output_path, format="mp3")
+                # Export under a temporary name: other render workers may be picking songs
+                # from PROCESSED_DIR right now and must never see a half-written file
+                partial_path = output_path + ".part"
+                final_audio.export(partial_path, format="mp3")
                 logger.info(f"Saved as: {new_filename}")
 
                 # Verify duration of the processed file
                 duration = final_audio.duration_seconds
                 if duration < 120:  # 2 minutes = 120 seconds
                     logger.info(f"File too short ({duration:.2f}s). Removing: {new_filename} and original")
-                    os.remove(output_path)  # Remove the processed file
+                    os.remove(partial_path)  # Remove the processed file
                     if config.get("DELETE_UNPROCESSED", True):
                         os.remove(file_path)     # Remove the original file if enabled
                 else:
+                    os.replace(partial_path, output_path)
                     if config.get("DELETE_UNPROCESSED", True):
                         os.remove(file_path)  # Remove the original file if deletion is enabled
                         logger.info(f"Removed original: {filename}")
@@ -99,6 +132,8 @@ def process_songs(config):
                     if config.get("MARK_USED_SONG_NAMES", True):
                         names[next_name_index] = '-' + names[next_name_index]
                         save_names(NAMES_FILE_PATH, names)
+                    if fingerprint is not None:
+                        index.add(new_filename[:-4], fingerprint)
                     processed_count += 1
 
                 names, next_name_index = load_names(NAMES_FILE_PATH)
@@ -106,10 +141,14 @@ def process_songs(config):
                     logger.warning("No more song names available")
                     break
 
+        if index is not None:
+            index.save()
         logger.success(f"Processed {processed_count} files")
 
     except Exception as e:
         logger.error(f"Processing failed: {str(e)}")
+        if index is not None:
+            index.save()
         raise
 
 if __name__ == "__main__":
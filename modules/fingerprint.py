@@ -0,0 +1,183 @@
+#fingerprint.py
+import os
+import sys
+import numpy as np
+from pydub import AudioSegment
+from pydub.silence import detect_leading_silence
+from logger import ColoredLogger
+
+logger = ColoredLogger("FINGERPRINT")
+
+SAMPLE_RATE = 11025
+WINDOW_SECONDS = 120  # Every processed song is at least this long
+TIME_BLOCKS = 24
+BANDS = 16
+N_FFT = 2048
+MAX_SHIFT_SECONDS = 4  # Largest intro/fade-in difference a lookup still lines up
+
+def band_frames(audio, seconds):
+    """
+    Log-band power of non-overlapping N_FFT frames over the first `seconds` after leading
+    silence, returned as a (frames + 1, BANDS) cumulative sum so any frame range averages in O(1).
+    """
+    start = detect_leading_silence(audio, silence_threshold=-50)
+    audio = audio[start:start + int(seconds * 1000)].set_channels(1).set_frame_rate(SAMPLE_RATE)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    samples /= float(1 << (8 * audio.sample_width - 1))
+    samples = np.pad(samples, (0, max(0, SAMPLE_RATE * WINDOW_SECONDS - len(samples))))
+
+    # Short-time power spectrum, one rfft over all frames
+    frames = len(samples) // N_FFT
+    spectrum = np.abs(np.fft.rfft(samples[:frames * N_FFT].reshape(frames, N_FFT) * np.hanning(N_FFT), axis=1)) ** 2
+
+    # Log-spaced bands from ~40Hz
+    edges = np.geomspace(8, N_FFT // 2, BANDS + 1).astype(np.int64)
+    band_energy = np.add.reduceat(spectrum, edges[:-1], axis=1)[:, :BANDS]
+    return np.concatenate([np.zeros((1, BANDS)), np.cumsum(band_energy, axis=0)])
+
+def pool_blocks(cumulative, shifts):
+    """
+    Fingerprints of the frames in cumulative for every shift (in frames): block k of shift s
+    covers the frames the stored block k covers when the audio starts s frames later. Blocks
+    cut off at either end are averaged over the frames that exist.
+    """
+    frames = len(cumulative) - 1
+    window_frames = SAMPLE_RATE * WINDOW_SECONDS // N_FFT
+    block_edges = np.round(np.arange(TIME_BLOCKS + 1) * window_frames / TIME_BLOCKS).astype(np.int64)
+    edges = np.clip(block_edges[None, :] - np.asarray(shifts)[:, None], 0, frames)
+    low = np.minimum(edges[:, :-1], frames - 1)
+    high = np.maximum(edges[:, 1:], low + 1)
+    energy = np.log10((cumulative[high] - cumulative[low]) / (high - low)[:, :, None] + 1e-10)
+
+    # Each band and each block is mean-centered per shift
+    energy -= energy.mean(axis=1, keepdims=True)
+    energy -= energy.mean(axis=2, keepdims=True)
+    vectors = energy.reshape(len(edges), TIME_BLOCKS * BANDS)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+def compute_fingerprint(audio):
+    """
+    Return a compact, L2-normalized float32 vector describing the first two minutes of audio.
+    Leading silence is skipped and log band energies are pooled into 5 second blocks, so the
+    trimmed/faded output of cut_songs and fresh re-exports map to nearly the same vector.
+    Each band and each block is mean-centered, which removes the spectral tilt and loudness
+    that all songs share and keeps only how the song moves across bands over time.
+    """
+    return pool_blocks(band_frames(audio, WINDOW_SECONDS), [0])[0]
+
+def compute_query_fingerprints(audio, max_shift_seconds=MAX_SHIFT_SECONDS):
+    """
+    Return (fingerprint, shifted): the stored fingerprint of audio plus one variant per frame of
+    shift up to max_shift_seconds either way, so a lookup still lines up with a copy whose
+    intro is a few seconds longer or shorter.
+    """
+    max_shift = int(round(max_shift_seconds * SAMPLE_RATE / N_FFT))
+    cumulative = band_frames(audio, WINDOW_SECONDS + max_shift_seconds)
+    shifted = pool_blocks(cumulative, np.arange(-max_shift, max_shift + 1))
+    return shifted[max_shift], shifted
+
+class FingerprintIndex:
+    """Persistent fingerprint store backed by a single .npz file with brute-force cosine lookup."""
+
+    def __init__(self, path):
+        self.path = path
+        self.names = []
+        self.name_set = set()
+        self.vectors = np.empty((0, TIME_BLOCKS * BANDS), dtype=np.float32)
+        # Added fingerprints are stacked onto vectors in one go, on the next lookup or save
+        self.pending = []
+        if os.path.exists(path):
+            with np.load(path) as data:
+                if data["vectors"].shape[1] != self.vectors.shape[1]:
+                    raise ValueError(f"Fingerprint index {path} uses an older format, rebuild it with "
+                                     f"'python fingerprint.py index {path} <songs_dir>'")
+                self.names = [str(name) for name in data["names"]]
+                self.vectors = data["vectors"].astype(np.float32)
+            self.name_set = set(self.names)
+            logger.info(f"Loaded {len(self.names)} fingerprints from {path}")
+
+    def __len__(self):
+        return len(self.names)
+
+    def query(self, vectors):
+        """
+        Return (name, similarity) of the closest stored fingerprint, or (None, 0.0) if empty.
+        vectors may be a single fingerprint or a (shifts, dim) stack; the best shift counts.
+        """
+        matrix = self.matrix()
+        if not len(matrix):
+            return None, 0.0
+        similarities = (matrix @ np.atleast_2d(vectors).T).max(axis=1)
+        best = int(np.argmax(similarities))
+        return self.names[best], float(similarities[best])
+
+    def __contains__(self, name):
+        return name in self.name_set
+
+    def matrix(self):
+        if self.pending:
+            self.vectors = np.vstack([self.vectors] + self.pending)
+            self.pending = []
+        return self.vectors
+
+    def nearest_neighbor_similarities(self, chunk=1024):
+        """Similarity of every stored fingerprint to its closest other entry."""
+        vectors = self.matrix()
+        best = np.empty(len(self.names), dtype=np.float32)
+        for start in range(0, len(self.names), chunk):
+            similarities = vectors[start:start + chunk] @ vectors.T
+            rows = np.arange(similarities.shape[0])
+            similarities[rows, rows + start] = -1.0
+            best[start:start + chunk] = similarities.max(axis=1)
+        return best
+
+    def add(self, name, vector):
+        self.names.append(name)
+        self.name_set.add(name)
+        self.pending.append(vector[None, :])
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, names=np.array(self.names, dtype=str), vectors=self.matrix())
+        os.replace(tmp_path, self.path)
+
+def index_directory(index, directory):
+    """Add every mp3 in directory that is not in the index yet, named after its file."""
+    added = 0
+    for filename in os.listdir(directory):
+        if filename.lower().endswith('.mp3') and filename[:-4] not in index:
+            audio = AudioSegment.from_mp3(os.path.join(directory, filename))
+            index.add(filename[:-4], compute_fingerprint(audio))
+            added += 1
+    return added
+
+def calibrate(index):
+    """Print how close distinct indexed songs get to each other, to pick DUPLICATE_THRESHOLD."""
+    if len(index) < 2:
+        logger.error("Need at least two indexed songs to calibrate")
+        return
+    best = index.nearest_neighbor_similarities()
+    for percentile in (50, 90, 99, 100):
+        logger.info(f"p{percentile} nearest-neighbor similarity: {np.percentile(best, percentile):.3f}")
+    logger.info("Set DUPLICATE_THRESHOLD safely above p100 if the indexed songs are all distinct. "
+                "Lookups try every start shift up to MAX_SHIFT_SECONDS, which raises distinct songs' "
+                "scores a little over this unshifted p100")
+
+if __name__ == "__main__":
+    # Backfill an index from already processed or published songs:
+    #   python fingerprint.py index templates/VPM/VPM_fingerprints.npz <songs_dir> [<songs_dir> ...]
+    # Check how similar distinct songs of the channel score:
+    #   python fingerprint.py calibrate templates/VPM/VPM_fingerprints.npz
+    command, index = sys.argv[1], FingerprintIndex(sys.argv[2])
+    if command == "calibrate":
+        calibrate(index)
+    else:
+        for directory in sys.argv[3:]:
+            logger.info(f"Indexed {index_directory(index, directory)} songs from {directory}")
+        index.save()
+        logger.success(f"Index holds {len(index)} fingerprints")
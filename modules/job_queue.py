@@ -0,0 +1,197 @@
+#job_queue.py
+import contextlib
+import os
+import sqlite3
+import time
+from logger import ColoredLogger
+
+logger = ColoredLogger("QUEUE")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL,
+    output_dir TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS locks (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+class LeaseLost(RuntimeError):
+    """Raised when a worker no longer owns the job or lock it is working on."""
+
+class JobQueue:
+    """
+    Render job queue stored in a single SQLite file that several worker processes (or hosts
+    sharing the directory) poll. Claims happen inside BEGIN IMMEDIATE transactions, so exactly
+    one worker wins each job. Claims are leases: a worker must heartbeat before lease_expires,
+    otherwise the job is handed to the next worker that polls. The (worker, attempts) pair acts
+    as a fencing token, so a stalled worker can never complete a job that has been reclaimed.
+    """
+
+    def __init__(self, path, jobs_dir, lease_seconds=120, max_attempts=3):
+        self.path = path
+        self.jobs_dir = jobs_dir
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for directory in (os.path.dirname(path), jobs_dir):
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # One short-lived connection per call keeps the queue safe to use from heartbeat threads
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def enqueue(self, model, count=1):
+        ids = []
+        with self._transaction() as db:
+            for _ in range(count):
+                cursor = db.execute("INSERT INTO jobs (model, created) VALUES (?, ?)", (model, time.time()))
+                job_id = cursor.lastrowid
+                output_dir = os.path.join(self.jobs_dir, f"job-{job_id:06d}")
+                db.execute("UPDATE jobs SET output_dir = ? WHERE id = ?", (output_dir, job_id))
+                ids.append(job_id)
+        logger.info(f"Enqueued {count} {model} job(s): {ids}")
+        return ids
+
+    def claim(self, worker):
+        """Claim the oldest pending (or stalled) job for worker and return it as a dict, or None."""
+        now = time.time()
+        with self._transaction() as db:
+            while True:
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE status = 'pending' "
+                    "OR (status = 'running' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["status"] == "running":
+                    logger.info(f"Reclaiming stalled job {row['id']} from {row['worker']}")
+                if row["attempts"] >= self.max_attempts:
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', finished = ?, "
+                        "error = COALESCE(error, 'lease expired') WHERE id = ?",
+                        (now, row["id"]),
+                    )
+                    continue
+                attempt = row["attempts"] + 1
+                db.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = ?, lease_expires = ? WHERE id = ?",
+                    (worker, attempt, now + self.lease_seconds, row["id"]),
+                )
+                job = dict(row)
+                job.update(worker=worker, attempts=attempt, status="running")
+                # Each attempt renders into its own staging directory
+                job["staging_dir"] = f"{job['output_dir']}.attempt{attempt}"
+                # Only an attempt that ended through fail() has surely stopped writing to its
+                # folder; a reclaimed one may belong to a worker that is stalled but alive
+                job["previous_failed"] = row["status"] == "pending" and row["attempts"] > 0
+                return job
+
+    def heartbeat(self, job):
+        """Extend the job lease and any locks held by its worker. Returns False if the lease was lost."""
+        expires = time.time() + self.lease_seconds
+        with self._transaction() as db:
+            owned = db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'running' "
+                "AND worker = ? AND attempts = ?",
+                (expires, job["id"], job["worker"], job["attempts"]),
+            ).rowcount == 1
+            if owned:
+                db.execute("UPDATE locks SET expires = ? WHERE owner = ?", (expires, job["worker"]))
+        return owned
+
+    def complete(self, job):
+        """
+        Publish the staging directory as the job's output directory and mark the job done.
+        Both happen while holding the database write lock, after the ownership check.
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT status, worker, attempts FROM jobs WHERE id = ?", (job["id"],)
+            ).fetchone()
+            if (row["status"], row["worker"], row["attempts"]) != ("running", job["worker"], job["attempts"]):
+                raise LeaseLost(f"Job {job['id']} is no longer owned by {job['worker']}")
+            os.replace(job["staging_dir"], job["output_dir"])
+            db.execute(
+                "UPDATE jobs SET status = 'done', finished = ?, lease_expires = NULL WHERE id = ?",
+                (time.time(), job["id"]),
+            )
+
+    def fail(self, job, error):
+        """
+        Record a failed attempt; the job goes back to pending until max_attempts is reached.
+        Returns the job's new status, or None if the worker no longer owned it.
+        """
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_expires = NULL, finished = ? "
+                "WHERE id = ? AND worker = ? AND attempts = ? AND status = 'running'",
+                (self.max_attempts, str(error), time.time(), job["id"], job["worker"], job["attempts"]),
+            ).rowcount == 1
+            if not updated:
+                return None
+            return db.execute("SELECT status FROM jobs WHERE id = ?", (job["id"],)).fetchone()["status"]
+
+    @contextlib.contextmanager
+    def lock(self, name, owner, poll_seconds=1.0):
+        """
+        Named lease lock shared by all workers, renewed by heartbeat() while the owner works.
+        An owner that stops heartbeating loses the lock once it expires.
+        """
+        while True:
+            now = time.time()
+            with self._transaction() as db:
+                row = db.execute("SELECT owner, expires FROM locks WHERE name = ?", (name,)).fetchone()
+                if row is None or row["expires"] < now or row["owner"] == owner:
+                    db.execute(
+                        "INSERT OR REPLACE INTO locks (name, owner, expires) VALUES (?, ?, ?)",
+                        (name, owner, now + self.lease_seconds),
+                    )
+                    break
+            time.sleep(poll_seconds)
+        try:
+            yield
+        finally:
+            with self._transaction() as db:
+                db.execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+
+    def jobs(self, status):
+        with self._transaction() as db:
+            rows = db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self):
+        with self._transaction() as db:
+            rows = db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
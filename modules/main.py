@@ -3,8 +3,12 @@ import cut_songs
 import assemble_songs
 import create_video
 import create_thumbnail
+import create_draft
 from pydub import AudioSegment
+import contextlib
+import json
 import os
+import shutil
 import sys
 from logger import ColoredLogger
 
@@ -97,13 +101,17 @@ def preflight_check(config):
                               if f.lower().endswith(('png', 'jpg', 'jpeg'))])
 
     # Validation
-    if processed_duration < required_duration:
+    if config.get("DRAFT_MODE", False):
+        # Drafts only preview what is already processed
+        if processed_duration < required_duration:
+            errors.append(f"Draft needs {required_duration//60000}min processed audio, only have {processed_duration//60000}min")
+    elif processed_duration < required_duration:
         if not unprocessed_files:
             errors.append(f"Need {required_duration//60000}min audio, only have {processed_duration//60000}min")
         elif song_names_available < len(unprocessed_files):
             errors.append(f"{song_names_available} song names for {len(unprocessed_files)} songs")
 
-    if title_names_available == 0:
+    if title_names_available == 0 and not config.get("DRAFT_MODE", False):
         errors.append("No video titles available")
     
     if available_images == 0:
@@ -111,10 +119,8 @@ def preflight_check(config):
 
     return errors
 
-def main():
-    model = "VPM"
-    
-    config = {
+def build_config(model="VPM", output_dir="output"):
+    return {
         "UNPROCESSED_DIR": f"templates/{model}/{model}_unprocessed_songs",
         "PROCESSED_DIR": f"templates/{model}/{model}_processed_songs",
         "IMAGES_DIR": f"templates/{model}/{model}_images",
@@ -122,19 +128,49 @@ def main():
         "TITLE_TEMPLATE_FILE": f"templates/{model}/{model}_title_names.txt",
         "DESCRIPTION_TEMPLATE_FILE": f"templates/{model}/{model}_description.txt",
         "THUMBNAIL_TEXT_FILE": f"templates/{model}/{model}_thumbnail_text.txt",
+        "DRAFT_IMAGE_FILE": f"templates/{model}/{model}_draft_image.txt",
+        "FINGERPRINT_INDEX_FILE": f"templates/{model}/{model}_fingerprints.npz",
+        "DUPLICATES_DIR": f"templates/{model}/{model}_duplicates",
         "TEMPLATES_DIR": f"templates/{model}",
 
-        "DESCRIPTION_OUTPUT_FILE": "output/description.txt",
-        "TITLE_OUTPUT_FILE": "output/title.txt",
-        "AUDIO_MIX_FILE": "output/video-mix.mp3",
-        "VIDEO_OUTPUT_FILE": "output/video-mix.mp4",
-        "THUMBNAIL_OUTPUT": "output/thumbnail.jpg",
+        "DESCRIPTION_OUTPUT_FILE": f"{output_dir}/description.txt",
+        "TITLE_OUTPUT_FILE": f"{output_dir}/title.txt",
+        "AUDIO_MIX_FILE": f"{output_dir}/video-mix.mp3",
+        "VIDEO_OUTPUT_FILE": f"{output_dir}/video-mix.mp4",
+        "THUMBNAIL_OUTPUT": f"{output_dir}/thumbnail.jpg",
+        "CLAIM_FILE": f"{output_dir}/claim.json",
+        "CLAIMED_SONGS_DIR": f"{output_dir}/claimed_songs",
+        "DRAFT_AUDIO_FILE": f"{output_dir}/draft-mix.mp3",
+        "DRAFT_VIDEO_FILE": f"{output_dir}/draft-mix.mp4",
+        "DRAFT_DESCRIPTION_FILE": f"{output_dir}/draft-tracklist.txt",
 
         "START_OFFSET": 10000,
         "SILENCE_THRESHOLD": -30,
         "MIN_SILENCE_2": 2000,
         "SEEK_STEP": 10,
         "VIDEO_LENGTH_MINUTES": 70,
+        "DUPLICATE_THRESHOLD": 0.75,
+        "DUPLICATE_ACTION": "flag",
+
+        "PARALLEL_ENCODE": False,
+        "ENCODE_WORKERS": None,
+        "ENCODE_PRESET": "medium",
+        "ENCODE_GOP": None,
+
+        "VISUALIZER": False,
+        "VISUALIZER_FPS": 30,
+        "VISUALIZER_BARS": 64,
+        "VISUALIZER_WIDTH": None,
+        "VISUALIZER_HEIGHT": None,
+        "VISUALIZER_COLOR": (255, 255, 255),
+
+        "DRAFT_MODE": False,
+        "DRAFT_SAMPLE_SECONDS": 15,
+        "DRAFT_WIDTH": 320,
+        "DRAFT_FPS": 1,
+        "DRAFT_VIDEO_BITRATE": "100k",
+        "DRAFT_AUDIO_BITRATE": "48k",
+        "DRAFT_AUDIO_FRAME_RATE": 22050,
 
         "RUN_INDIVIDUALLY": True,
 
@@ -144,7 +180,159 @@ def main():
         "DELETE_USED_IMAGES": True,
         "MARK_USED_SONG_NAMES": True,
         "MARK_USED_TITLE_NAMES": True,
+        "CLAIM_RESOURCES": False,
+    }
+
+def save_claim(config, claim):
+    tmp_path = config["CLAIM_FILE"] + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(claim, f, indent=2)
+    os.replace(tmp_path, config["CLAIM_FILE"])
+
+def load_claim(config):
+    """Return the resources claimed by an earlier attempt of this job, or None."""
+    if not os.path.exists(config["CLAIM_FILE"]):
+        return None
+    with open(config["CLAIM_FILE"], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def claim_resources(config):
+    """
+    Take songs, a title and an image out of the shared pool for this job and record them
+    in CLAIM_FILE. Only this step needs the selection lock; decoding and rendering don't.
+    The claim is written as an intent record before anything is marked or moved and only
+    switches to state "claimed" once every move is done, so a crash in between can be rolled
+    back by release_claim.
+    """
+    job_dir = os.path.dirname(config["CLAIM_FILE"])
+    songs = assemble_songs.select_songs(config)
+    image_path = create_video.select_image(config)
+    title_line, title_name = assemble_songs.peek_title(config)
+
+    # Only file names are stored: a retry renames the job folder before resuming from it
+    claim = {
+        "state": "claiming",
+        "songs": [os.path.basename(file_path) for file_path in songs],
+        "title_line": title_line,
+        "title": title_name,
+        "title_marked": False,
+        "image": os.path.basename(image_path),
+        # Move the image out of the pool too, unless images are meant to be reused
+        "image_claimed": config.get("DELETE_USED_IMAGES", True),
+        "done": [],
     }
+    save_claim(config, claim)
+
+    assemble_songs.mark_title(config, title_line)
+    claim["title_marked"] = True
+    save_claim(config, claim)
+
+    os.makedirs(config["CLAIMED_SONGS_DIR"], exist_ok=True)
+    for file_path in songs:
+        shutil.move(file_path, os.path.join(config["CLAIMED_SONGS_DIR"], os.path.basename(file_path)))
+    if claim["image_claimed"]:
+        shutil.move(image_path, os.path.join(job_dir, claim["image"]))
+
+    claim["state"] = "claimed"
+    save_claim(config, claim)
+    logger.info(f"Claimed {len(songs)} songs, title '{title_name}' and image {claim['image']}")
+    return claim
+
+def claimed_paths(config, claim):
+    """Return (song paths, image path) of a claim for the current job folder."""
+    songs = [os.path.join(config["CLAIMED_SONGS_DIR"], name) for name in claim["songs"]]
+    image_dir = os.path.dirname(config["CLAIM_FILE"]) if claim["image_claimed"] else config["IMAGES_DIR"]
+    return songs, os.path.join(image_dir, claim["image"])
+
+def release_claim(config, claim):
+    """
+    Return the claimed songs, title and image to the shared pool and drop CLAIM_FILE, so a
+    claim is released only once. Also rolls back a claim left half-done by a crash.
+    Call under the selection lock.
+    """
+    songs, image_path = claimed_paths(config, claim)
+    for file_path in songs:
+        if os.path.exists(file_path):
+            shutil.move(file_path, os.path.join(config["PROCESSED_DIR"], os.path.basename(file_path)))
+
+    if claim.get("title_marked", True):
+        assemble_songs.mark_title(config, claim["title_line"], used=False)
+
+    if claim["image_claimed"] and os.path.exists(image_path):
+        shutil.move(image_path, os.path.join(config["IMAGES_DIR"], claim["image"]))
+
+    os.remove(config["CLAIM_FILE"])
+    logger.info(f"Released claimed resources of {os.path.dirname(config['CLAIM_FILE'])}")
+
+def produce(config, ingest_lock=None, select_lock=None, check=None):
+    """
+    Run the full production for config, raising on failure.
+    With CLAIM_RESOURCES, resources are first claimed into the job folder under select_lock
+    (song ingestion runs under ingest_lock), every finished stage is recorded in CLAIM_FILE,
+    and a rerun on the same folder resumes after the last finished stage.
+    The locks are given as callables returning a fresh context manager on every use; check,
+    if given, is called between stages and raises to abort production.
+    """
+    ingest_lock = ingest_lock or contextlib.nullcontext
+    select_lock = select_lock or contextlib.nullcontext
+    check = check or (lambda: None)
+    claim = load_claim(config) if config.get("CLAIM_RESOURCES", False) else None
+    if claim is not None and claim.get("state") != "claimed":
+        # A previous attempt died while claiming: roll it back and claim afresh
+        logger.info("Rolling back an unfinished claim")
+        with select_lock():
+            release_claim(config, claim)
+        claim = None
+
+    if claim is None:
+        with ingest_lock():
+            cut_songs.process_songs(config)
+        if config.get("CLAIM_RESOURCES", False):
+            check()
+            with select_lock():
+                claim = claim_resources(config)
+    else:
+        logger.info(f"Resuming job, finished stages: {', '.join(claim['done']) or 'none'}")
+
+    if claim is not None:
+        config["SELECTED_SONGS"], config["SELECTED_IMAGE"] = claimed_paths(config, claim)
+        config["SELECTED_TITLE"] = claim["title"]
+
+    stages = [
+        ("assemble", assemble_songs.assemble_songs),
+        ("video", create_video.create_video),
+        ("thumbnail", create_thumbnail.process_thumbnail),
+    ]
+    for name, stage in stages:
+        if claim is not None and name in claim["done"]:
+            continue
+        check()
+        stage(config)
+        check()
+        if claim is not None:
+            claim["done"].append(name)
+            save_claim(config, claim)
+
+    # Claimed songs are only let go once the video exists
+    if claim is not None and os.path.exists(config["CLAIMED_SONGS_DIR"]):
+        if config.get("DELETE_PROCESSED", True):
+            shutil.rmtree(config["CLAIMED_SONGS_DIR"])
+            logger.info(f"Removed {len(claim['songs'])} processed files")
+        else:
+            with select_lock():
+                check()
+                for file_path in config["SELECTED_SONGS"]:
+                    shutil.move(file_path, os.path.join(config["PROCESSED_DIR"], os.path.basename(file_path)))
+            os.rmdir(config["CLAIMED_SONGS_DIR"])
+
+    # Cleanup after all processing: remove used image if enabled
+    if "SELECTED_IMAGE" in config and os.path.exists(config["SELECTED_IMAGE"]):
+        if config.get("DELETE_USED_IMAGES", True):
+            os.remove(config["SELECTED_IMAGE"])
+            logger.info(f"Removed used template image: {os.path.basename(config['SELECTED_IMAGE'])}")
+
+def main():
+    config = build_config("VPM")
 
     logger.module_start()
     logger.info("Running preflight checks")
@@ -160,20 +348,19 @@ def main():
 
     logger.success("All checks passed")
     
+    if config.get("DRAFT_MODE", False):
+        try:
+            create_draft.create_draft(config)
+            logger.success("Draft completed")
+        except Exception as e:
+            logger.error(f"Draft failed: {str(e)}")
+            sys.exit(1)
+        return
+
     try:
-        cut_songs.process_songs(config)
-        assemble_songs.assemble_songs(config)
-        create_video.create_video(config)
-        create_thumbnail.process_thumbnail(config)
-        
+        produce(config)
         logger.success("Production completed")
         print(get_resource_report(config))
-        
-        # Cleanup after all processing: remove used image if enabled
-        if "SELECTED_IMAGE" in config and os.path.exists(config["SELECTED_IMAGE"]):
-            if config.get("DELETE_USED_IMAGES", True):
-                os.remove(config["SELECTED_IMAGE"])
-                logger.info(f"Removed used template image: {os.path.basename(config['SELECTED_IMAGE'])}")
             
     except Exception as e:
         logger.error(f"Production failed: {str(e)}")
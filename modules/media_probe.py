@@ -0,0 +1,34 @@
+#media_probe.py
+import re
+import subprocess
+from fractions import Fraction
+from imageio_ffmpeg import get_ffmpeg_exe
+
+TIMEBASE_PATTERN = re.compile(r"^#tb \d+: (\d+)/(\d+)", re.MULTILINE)
+
+def run_ffmpeg(args):
+    command = [get_ffmpeg_exe(), "-y", "-nostdin", "-hide_banner", "-v", "error"] + args
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip().splitlines()[-1:]}")
+    return result.stdout
+
+def stream_packets(path, stream):
+    """
+    Return (timebase, [(pts, duration), ...]) for every packet of one stream ('a' or 'v'),
+    read with the framecrc muxer so nothing is decoded.
+    """
+    output = run_ffmpeg(["-i", path, "-map", f"0:{stream}:0", "-c", "copy", "-f", "framecrc", "-"])
+    timebase = TIMEBASE_PATTERN.search(output)
+    if timebase is None:
+        raise RuntimeError(f"Could not read {stream} stream of {path}")
+    packets = []
+    for line in output.splitlines():
+        if line and not line.startswith("#"):
+            fields = [field.strip() for field in line.split(",")]
+            packets.append((int(fields[2]), int(fields[3])))
+    packets.sort()
+    return Fraction(int(timebase.group(1)), int(timebase.group(2))), packets
+
+def packets_duration(timebase, packets):
+    return float((packets[-1][0] + packets[-1][1] - packets[0][0]) * timebase)
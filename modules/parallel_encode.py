@@ -0,0 +1,103 @@
+#parallel_encode.py
+import math
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from media_probe import run_ffmpeg, stream_packets, packets_duration
+from logger import ColoredLogger
+
+logger = ColoredLogger("ENCODE")
+
+def encode_segment(image_path, segment_path, frames, fps, gop, threads, preset):
+    """Encode `frames` frames of the still image as a video-only segment with a fixed GOP."""
+    run_ffmpeg([
+        "-loop", "1", "-framerate", str(fps), "-i", image_path,
+        "-frames:v", str(frames),
+        "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2,format=yuv420p",
+        "-c:v", "libx264", "-preset", preset, "-threads", str(threads),
+        # Identical, closed, fixed-size GOPs in every segment: each boundary is an IDR frame
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0", "-bf", "0",
+        "-an", segment_path,
+    ])
+    return segment_path
+
+def encode_audio(audio_path, output_path, bitrate):
+    """Encode the whole mix in one pass so the AAC stream has no joins at all."""
+    run_ffmpeg(["-i", audio_path, "-vn", "-c:a", "aac", "-b:a", bitrate, output_path])
+    return output_path
+
+def encode_parallel(config, image_path, audio_path, output_path):
+    """
+    Encode a still-image video by splitting the timeline into GOP-aligned segments,
+    encoding them in a process pool and joining them with the concat demuxer (stream copy).
+    The audio is encoded once and muxed over the joined video, then the result is checked
+    for A/V drift.
+    """
+    fps = config.get("VIDEO_FPS", 24)
+    workers = config.get("ENCODE_WORKERS") or os.cpu_count() or 1
+    preset = config.get("ENCODE_PRESET", "medium")
+    gop = config.get("ENCODE_GOP") or fps * 2
+
+    audio_seconds = packets_duration(*stream_packets(audio_path, "a"))
+    total_frames = math.ceil(audio_seconds * fps)
+    # Segment length is a whole number of GOPs, so every cut lands on a keyframe
+    gops_per_segment = max(1, math.ceil(math.ceil(total_frames / gop) / workers))
+    segment_frames = gops_per_segment * gop
+    segments = [min(segment_frames, total_frames - start) for start in range(0, total_frames, segment_frames)]
+    threads = max(1, (os.cpu_count() or 1) // len(segments))
+    logger.info(f"Encoding {total_frames} frames as {len(segments)} segments on {workers} workers")
+
+    work_dir = output_path + ".segments"
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+    try:
+        segment_paths = [os.path.join(work_dir, f"segment_{i:05d}.mp4") for i in range(len(segments))]
+        audio_out = os.path.join(work_dir, "audio.m4a")
+        # One extra process for the audio so it never takes a slot from the video segments
+        with ProcessPoolExecutor(max_workers=workers + 1) as pool:
+            audio_future = pool.submit(encode_audio, audio_path, audio_out, config.get("ENCODE_AUDIO_BITRATE", "192k"))
+            futures = [pool.submit(encode_segment, image_path, path, frames, fps, gop, threads, preset)
+                       for path, frames in zip(segment_paths, segments)]
+            for future in futures:
+                future.result()
+            audio_future.result()
+
+        list_path = os.path.join(work_dir, "segments.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in segment_paths:
+                f.write(f"file '{os.path.basename(path)}'\n")
+
+        logger.info("Joining segments...")
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", list_path, "-i", audio_out,
+            "-map", "0:v", "-map", "1:a", "-c", "copy", "-movflags", "+faststart", output_path,
+        ])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    verify_av_sync(output_path, total_frames, fps, audio_seconds)
+    logger.success(f"Parallel encode finished: {output_path}")
+
+def verify_av_sync(video_path, expected_frames, fps, audio_seconds, tolerance=0.1):
+    """
+    Check the joined file packet by packet: every frame survived the concat, video and
+    audio timestamps run without gaps across the segment joins, and both streams end together.
+    """
+    video_tb, video_packets = stream_packets(video_path, "v")
+    audio_tb, audio_packets = stream_packets(video_path, "a")
+    if len(video_packets) != expected_frames:
+        raise RuntimeError(f"Video has {len(video_packets)} frames, expected {expected_frames}")
+    for packets, timebase, kind in ((video_packets, video_tb, "video"), (audio_packets, audio_tb, "audio")):
+        for (pts, duration), (next_pts, _) in zip(packets, packets[1:]):
+            if next_pts != pts + duration:
+                raise RuntimeError(f"{kind} timestamp gap at {float(pts * timebase):.3f}s")
+
+    video_seconds = packets_duration(video_tb, video_packets)
+    muxed_audio_seconds = packets_duration(audio_tb, audio_packets)
+    if abs(muxed_audio_seconds - audio_seconds) > tolerance:
+        raise RuntimeError(f"Audio is {muxed_audio_seconds:.3f}s, source mix is {audio_seconds:.3f}s")
+    if abs(video_seconds - muxed_audio_seconds) > 1 / fps + tolerance:
+        raise RuntimeError(f"A/V drift: video {video_seconds:.3f}s, audio {muxed_audio_seconds:.3f}s")
+    logger.info(f"A/V check passed: {len(video_packets)} frames, {video_seconds:.3f}s video, "
+                f"{muxed_audio_seconds:.3f}s audio")
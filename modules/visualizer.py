@@ -0,0 +1,157 @@
+#visualizer.py
+import os
+import subprocess
+import numpy as np
+from PIL import Image
+from imageio_ffmpeg import get_ffmpeg_exe
+from logger import ColoredLogger
+
+logger = ColoredLogger("VISUALIZER")
+
+def decode_audio(audio_path, sample_rate):
+    """Decode the whole mix to mono int16 samples through ffmpeg."""
+    command = [
+        get_ffmpeg_exe(), "-v", "error", "-i", audio_path,
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-",
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, check=True)
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+def bar_edges(n_fft, sample_rate, bars, min_freq=40, max_freq=12000):
+    """Log-spaced FFT bin edges for the bars, with at least one bin per bar."""
+    max_freq = min(max_freq, sample_rate / 2)
+    freqs = np.geomspace(min_freq, max_freq, bars + 1)
+    edges = np.round(freqs * n_fft / sample_rate).astype(np.int64)
+    edges = np.maximum(edges, np.arange(bars + 1) + 1)
+    for i in range(1, len(edges)):
+        edges[i] = max(edges[i], edges[i - 1] + 1)
+    return np.minimum(edges, n_fft // 2 + 1)
+
+def compute_levels(samples, sample_rate, fps, bars, n_fft=2048, batch_frames=1024, decay=0.85):
+    """
+    Return a (frames, bars) float32 array of bar levels in [0, 1].
+    Spectra are computed batch_frames at a time with one rfft call per batch.
+    """
+    total_frames = int(np.ceil(len(samples) * fps / sample_rate))
+    padded = np.pad(samples.astype(np.float32) / 32768.0, (n_fft // 2, n_fft // 2))
+    window = np.hanning(n_fft).astype(np.float32)
+    edges = bar_edges(n_fft, sample_rate, bars)
+    widths = np.diff(edges).astype(np.float32)
+    offsets = np.arange(n_fft)
+    hop = sample_rate / fps
+
+    levels = np.empty((total_frames, bars), dtype=np.float32)
+    for start in range(0, total_frames, batch_frames):
+        stop = min(start + batch_frames, total_frames)
+        starts = np.round(np.arange(start, stop) * hop).astype(np.int64)
+        idx = np.minimum(starts[:, None] + offsets[None, :], len(padded) - 1)
+        spectrum = np.abs(np.fft.rfft(padded[idx] * window, axis=1))
+        energy = np.add.reduceat(spectrum, edges[:-1], axis=1)[:, :bars] / widths
+        levels[start:stop] = 20 * np.log10(energy + 1e-9)
+
+    # Normalize against the loudest bar of the whole mix, 60 dB of range
+    peak = levels.max() if total_frames else 0.0
+    np.clip((levels - (peak - 60)) / 60, 0, 1, out=levels)
+
+    # Fast attack, slow release so bars don't flicker
+    for i in range(1, total_frames):
+        np.maximum(levels[i], levels[i - 1] * decay, out=levels[i])
+    return levels
+
+def load_background(image_path, width=None, height=None):
+    """
+    Load the image as an RGB frame. Without a size it keeps the image's own size (rounded
+    down to even numbers for yuv420p); with one it is scaled to cover the frame and
+    center-cropped, so the template art is never stretched.
+    """
+    with Image.open(image_path) as img:
+        img = img.convert("RGB")
+        if not width or not height:
+            width, height = img.width // 2 * 2, img.height // 2 * 2
+        scale = max(width / img.width, height / img.height)
+        scaled = (max(width, round(img.width * scale)), max(height, round(img.height * scale)))
+        if scaled != img.size:
+            img = img.resize(scaled)
+        left = (img.width - width) // 2
+        top = (img.height - height) // 2
+        img = img.crop((left, top, left + width, top + height))
+        return np.ascontiguousarray(np.array(img))
+
+def render_visualizer(config, image_path, audio_path, output_path):
+    """
+    Render image_path with spectrum bars over it and mux audio_path into output_path.
+    Frames are drawn into one reused buffer and piped to ffmpeg as raw RGB.
+    """
+    background = load_background(image_path, config.get("VISUALIZER_WIDTH"), config.get("VISUALIZER_HEIGHT"))
+    height, width = background.shape[:2]
+    fps = config.get("VISUALIZER_FPS", 30)
+    bars = config.get("VISUALIZER_BARS", 64)
+    sample_rate = config.get("VISUALIZER_SAMPLE_RATE", 22050)
+    color = np.array(config.get("VISUALIZER_COLOR", (255, 255, 255)), dtype=np.uint8)
+    area_height = int(height * config.get("VISUALIZER_HEIGHT_RATIO", 0.25))
+    margin = int(height * 0.05)
+
+    logger.info("Analysing audio...")
+    samples = decode_audio(audio_path, sample_rate)
+    levels = compute_levels(samples, sample_rate, fps, bars)
+    del samples
+    total_frames = len(levels)
+    logger.info(f"Computed {total_frames} frames of {bars} bars")
+
+    # Bar geometry: which bar each column belongs to (-1 for gaps between bars)
+    area_left = int(width * 0.05)
+    area_width = width - 2 * area_left
+    slot = area_width / bars
+    columns = np.arange(area_width)
+    col_bar = (columns // slot).astype(np.int64)
+    col_bar[(columns - col_bar * slot) >= slot * 0.75] = -1
+    bar_pixels = np.append(np.zeros(bars, dtype=np.int64), 0)
+    rows = np.arange(area_height)[:, None]
+
+    top = height - margin - area_height
+    frame = background.copy()
+    region = frame[top:top + area_height, area_left:area_left + area_width]
+    region_background = background[top:top + area_height, area_left:area_left + area_width]
+    region_color = np.broadcast_to(color, region.shape)
+
+    command = [
+        get_ffmpeg_exe(), "-y", "-v", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+        "-i", audio_path,
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "libx264", "-preset", config.get("VISUALIZER_PRESET", "veryfast"), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", output_path,
+    ]
+    logger.info("Rendering visualizer video...")
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    finished = False
+    try:
+        try:
+            for i in range(total_frames):
+                # bar_pixels[-1] stays 0 so gap columns (index -1) never light up
+                bar_pixels[:bars] = levels[i] * area_height
+                mask = rows >= area_height - bar_pixels[col_bar]
+                np.copyto(region, region_background)
+                np.copyto(region, region_color, where=mask[:, :, None])
+                process.stdin.write(frame.data)
+            process.stdin.close()
+        except BrokenPipeError:
+            # ffmpeg quit early; its exit code below says why
+            pass
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {process.returncode}")
+        finished = True
+    finally:
+        if not finished:
+            # Don't leave an encoder running or a truncated video behind
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            if process.stdin and not process.stdin.closed:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+            if os.path.exists(output_path):
+                os.remove(output_path)
+    logger.success(f"Visualizer rendered: {output_path}")
@@ -0,0 +1,187 @@
+#worker.py
+import argparse
+import functools
+import os
+import shutil
+import socket
+import threading
+import time
+import main
+from job_queue import JobQueue, LeaseLost
+from logger import ColoredLogger
+
+logger = ColoredLogger("WORKER")
+
+QUEUE_FILE = "output/jobs.sqlite3"
+JOBS_DIR = "output/jobs"
+
+def heartbeat_loop(queue, job, stop, lost):
+    """Renew the job lease every third of its length until stopped; flag lost leases."""
+    while not stop.wait(queue.lease_seconds / 3):
+        try:
+            if not queue.heartbeat(job):
+                logger.error(f"Lost lease on job {job['id']}")
+                lost.set()
+                return
+        except Exception as e:
+            logger.error(f"Heartbeat failed for job {job['id']}: {str(e)}")
+
+def attempt_dirs(job):
+    """Staging directories left by earlier attempts of job, oldest first."""
+    jobs_dir = os.path.dirname(job["output_dir"]) or "."
+    prefix = os.path.basename(job["output_dir"]) + ".attempt"
+    attempts = sorted(int(name[len(prefix):]) for name in os.listdir(jobs_dir)
+                      if name.startswith(prefix) and name[len(prefix):].isdigit())
+    return [f"{job['output_dir']}.attempt{n}" for n in attempts]
+
+def take_over_previous(job, staging_dir):
+    """
+    Carry the claim of the latest earlier attempt into staging_dir and remove the old folders.
+    A folder whose attempt ended through fail() is renamed and resumed as is. Any other one may
+    still be written by a stalled worker, so only its claim and claimed files are copied and
+    production starts over with them.
+    """
+    previous = [path for path in attempt_dirs(job) if path != staging_dir]
+    if job["previous_failed"] and previous and previous[-1] == f"{job['output_dir']}.attempt{job['attempts'] - 1}":
+        os.replace(previous.pop(), staging_dir)
+        logger.info(f"Resuming job {job['id']} from attempt {job['attempts'] - 1}")
+    else:
+        os.makedirs(staging_dir)
+        for path in reversed(previous):
+            config = main.build_config(job["model"], path)
+            claim = main.load_claim(config)
+            if claim is None:
+                continue
+            staging_config = main.build_config(job["model"], staging_dir)
+            if os.path.exists(config["CLAIMED_SONGS_DIR"]):
+                shutil.copytree(config["CLAIMED_SONGS_DIR"], staging_config["CLAIMED_SONGS_DIR"])
+            image_path = main.claimed_paths(config, claim)[1]
+            if claim["image_claimed"] and os.path.exists(image_path):
+                shutil.copy2(image_path, staging_dir)
+            # The claim is written last, so a half-copied folder never looks claimed
+            claim["done"] = []
+            main.save_claim(staging_config, claim)
+            logger.info(f"Copied the claim of {os.path.basename(path)} for job {job['id']}")
+            break
+    for path in previous:
+        shutil.rmtree(path, ignore_errors=True)
+
+def run_job(queue, job):
+    staging_dir = job["staging_dir"]
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    take_over_previous(job, staging_dir)
+
+    config = main.build_config(job["model"], staging_dir)
+    # Songs, title and image are claimed into the job folder so retries reuse them
+    config["RUN_INDIVIDUALLY"] = False
+    config["CLAIM_RESOURCES"] = True
+
+    # Ingesting new songs and picking resources are the only steps that touch the shared
+    # template folders; decoding, mixing and rendering run without any lock
+    ingest_lock = functools.partial(queue.lock, f"ingest:{config['TEMPLATES_DIR']}", job["worker"])
+    select_lock = functools.partial(queue.lock, f"select:{config['TEMPLATES_DIR']}", job["worker"])
+
+    stop = threading.Event()
+    lost = threading.Event()
+    heartbeat = threading.Thread(target=heartbeat_loop, args=(queue, job, stop, lost), daemon=True)
+    heartbeat.start()
+
+    def check_lease():
+        if lost.is_set():
+            raise LeaseLost(f"Job {job['id']} was reclaimed during production")
+
+    try:
+        if main.load_claim(config) is None:
+            errors = main.preflight_check(config)
+            if errors:
+                raise RuntimeError("Preflight check failed: " + "; ".join(errors))
+        main.produce(config, ingest_lock, select_lock, check_lease)
+        check_lease()
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    queue.complete(job)
+
+def release_job(queue, job, worker_id):
+    """
+    Return the resources claimed by a failed job to the pool and delete its staging folders.
+    The claim is read, released and removed inside the selection lock, so concurrent cleanups
+    release it only once.
+    """
+    templates_dir = main.build_config(job["model"])["TEMPLATES_DIR"]
+    with queue.lock(f"select:{templates_dir}", worker_id):
+        paths = attempt_dirs(job)
+        # Earlier folders only ever hold copies of the latest claim
+        for path in reversed(paths):
+            config = main.build_config(job["model"], path)
+            claim = main.load_claim(config)
+            if claim is not None:
+                main.release_claim(config, claim)
+                break
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.info(f"Removed staging folder {path}")
+
+def cleanup_failed(queue, worker_id):
+    """Release failed jobs, including ones marked failed when their lease ran out."""
+    leftovers = {name.rsplit(".attempt", 1)[0] for name in os.listdir(queue.jobs_dir) if ".attempt" in name}
+    if not leftovers:
+        return
+    for job in queue.jobs("failed"):
+        if os.path.basename(job["output_dir"]) in leftovers:
+            release_job(queue, job, worker_id)
+
+def run_worker(queue, worker_id, poll_seconds=5.0, drain=False):
+    """Poll the queue and run jobs one at a time. With drain=True, exit once the queue is empty."""
+    logger.module_start()
+    logger.info(f"Worker {worker_id} polling {queue.path}")
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            cleanup_failed(queue, worker_id)
+            if drain:
+                logger.success(f"Queue drained: {queue.counts()}")
+                return
+            time.sleep(poll_seconds)
+            continue
+
+        logger.info(f"Claimed job {job['id']} ({job['model']}, attempt {job['attempts']})")
+        try:
+            run_job(queue, job)
+            logger.success(f"Job {job['id']} done: {job['output_dir']}")
+        except LeaseLost as e:
+            # Another worker owns the job now; leave its output alone
+            logger.error(str(e))
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {str(e)}")
+            if queue.fail(job, e) == "failed":
+                release_job(queue, job, worker_id)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed render workers")
+    parser.add_argument("--queue", default=QUEUE_FILE, help="SQLite queue file on a shared path")
+    parser.add_argument("--jobs-dir", default=JOBS_DIR, help="Directory holding per-job output folders")
+    parser.add_argument("--lease", type=float, default=120, help="Lease length in seconds")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add render jobs")
+    enqueue.add_argument("model")
+    enqueue.add_argument("count", type=int, nargs="?", default=1)
+
+    work = commands.add_parser("work", help="Run a worker")
+    work.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}")
+    work.add_argument("--poll", type=float, default=5.0)
+    work.add_argument("--drain", action="store_true", help="Exit when no jobs are left")
+
+    commands.add_parser("status", help="Show job counts")
+
+    args = parser.parse_args()
+    queue = JobQueue(args.queue, args.jobs_dir, lease_seconds=args.lease)
+    if args.command == "enqueue":
+        queue.enqueue(args.model, args.count)
+    elif args.command == "work":
+        run_worker(queue, args.id, args.poll, args.drain)
+    else:
+        print(queue.counts())
@@ -0,0 +1,78 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+
+pytest.importorskip("pydub")
+from pydub import AudioSegment
+from fingerprint import FingerprintIndex, compute_fingerprint, compute_query_fingerprints
+
+SAMPLE_RATE = 22050
+THRESHOLD = 0.75
+
+def synthetic_song(seed, seconds=150):
+    """Chords of decaying harmonics on a random tempo, over a little noise."""
+    rng = np.random.default_rng(seed)
+    out = np.zeros(SAMPLE_RATE * seconds, dtype=np.float32)
+    beat = 60 / rng.uniform(70, 140)
+    position = 0.0
+    while position < seconds:
+        length = rng.choice([4, 8]) * beat
+        t = np.arange(int(length * SAMPLE_RATE)) / SAMPLE_RATE
+        root = rng.integers(40, 64)
+        chord = np.zeros(len(t), dtype=np.float32)
+        for note in (root, root + rng.choice([3, 4]), root + 7):
+            freq = 440 * 2 ** ((note - 69) / 12)
+            for harmonic in range(1, 4):
+                chord += np.sin(2 * np.pi * freq * harmonic * t) / harmonic
+        chord *= np.exp(-(t % beat) / beat * rng.uniform(1, 4))
+        start = int(position * SAMPLE_RATE)
+        stop = min(len(out), start + len(chord))
+        out[start:stop] += chord[:stop - start]
+        position += length
+    return out + rng.standard_normal(len(out)).astype(np.float32) * 0.3
+
+def to_segment(samples):
+    pcm = (samples / 8 * 20000).clip(-32767, 32767).astype(np.int16)
+    return AudioSegment(pcm.tobytes(), frame_rate=SAMPLE_RATE, sample_width=2, channels=1)
+
+@pytest.fixture(scope="module")
+def songs():
+    return [synthetic_song(seed) for seed in range(4)]
+
+@pytest.fixture
+def index(tmp_path, songs):
+    index = FingerprintIndex(str(tmp_path / "index.npz"))
+    for i, song in enumerate(songs[:3]):
+        index.add(f"song{i}", compute_fingerprint(to_segment(song)))
+    return index
+
+@pytest.mark.parametrize("trim_seconds", [1.5, 3.0])
+def test_shifted_copy_is_caught(index, songs, trim_seconds):
+    # A re-export whose intro is a bit shorter starts mid-phrase, no silence to skip
+    trimmed = to_segment(songs[1][int(trim_seconds * SAMPLE_RATE):])
+    _, shifted = compute_query_fingerprints(trimmed)
+    name, similarity = index.query(shifted)
+    assert name == "song1"
+    assert similarity >= THRESHOLD
+
+def test_longer_intro_is_caught(index, songs):
+    intro = np.random.default_rng(99).standard_normal(int(2 * SAMPLE_RATE)).astype(np.float32) * 0.5
+    _, shifted = compute_query_fingerprints(to_segment(np.concatenate([intro, songs[2]])))
+    name, similarity = index.query(shifted)
+    assert name == "song2"
+    assert similarity >= THRESHOLD
+
+def test_distinct_song_is_not_flagged(index, songs):
+    _, shifted = compute_query_fingerprints(to_segment(songs[3]))
+    _, similarity = index.query(shifted)
+    assert similarity < THRESHOLD
+
+def test_index_round_trip(index, tmp_path):
+    index.save()
+    loaded = FingerprintIndex(index.path)
+    assert len(loaded) == 3
+    assert "song0" in loaded and "song9" not in loaded
+    np.testing.assert_array_equal(loaded.vectors, index.matrix())
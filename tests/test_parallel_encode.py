@@ -0,0 +1,66 @@
+import os
+import sys
+import wave
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+
+pytest.importorskip("imageio_ffmpeg")
+from media_probe import packets_duration, stream_packets
+from parallel_encode import encode_parallel
+
+SAMPLE_RATE = 44100
+FPS = 24
+GOP = 12
+
+def write_sine_wav(path, seconds, freq=440.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    samples = (np.sin(2 * np.pi * freq * t) * 0.3 * 32767).astype(np.int16)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.repeat(samples, 2).tobytes())
+
+def write_png(path):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    frame[:, :32] = (200, 40, 40)
+    Image.fromarray(frame).save(path)
+
+@pytest.fixture
+def media(tmp_path):
+    audio_path = tmp_path / "mix.wav"
+    image_path = tmp_path / "image.png"
+    write_sine_wav(audio_path, 4.3)
+    write_png(image_path)
+    return tmp_path, str(image_path), str(audio_path)
+
+def test_segments_join_without_gaps_or_drift(media, capsys):
+    tmp_path, image_path, audio_path = media
+    output_path = str(tmp_path / "video.mp4")
+    config = {"VIDEO_FPS": FPS, "ENCODE_WORKERS": 3, "ENCODE_GOP": GOP, "ENCODE_PRESET": "ultrafast"}
+
+    encode_parallel(config, image_path, audio_path, output_path)
+
+    # 4.3s at 24 fps is 9 GOPs of 12 frames: 3 workers get 3 GOPs each, so there are 2 joins
+    assert "as 3 segments" in capsys.readouterr().err
+    assert not os.path.exists(output_path + ".segments")
+
+    video_tb, video_packets = stream_packets(output_path, "v")
+    audio_tb, audio_packets = stream_packets(output_path, "a")
+    assert len(video_packets) == 104
+    for packets in (video_packets, audio_packets):
+        for (pts, duration), (next_pts, _) in zip(packets, packets[1:]):
+            assert next_pts == pts + duration
+
+    # Frames on both sides of each join keep the constant frame duration
+    frame_duration = video_packets[0][1]
+    for join in (3 * GOP, 6 * GOP):
+        assert video_packets[join][0] - video_packets[join - 1][0] == frame_duration
+
+    video_end = float((video_packets[-1][0] + video_packets[-1][1]) * video_tb)
+    audio_end = float((audio_packets[-1][0] + audio_packets[-1][1]) * audio_tb)
+    assert abs(video_end - audio_end) <= 1 / FPS + 0.05
+    assert abs(packets_duration(audio_tb, audio_packets) - 4.3) <= 0.05